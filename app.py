@@ -1,8 +1,13 @@
 import streamlit as st
-import graphviz
-from typing import Dict
-from backend import analyze_text_to_game, fetch_article
-from schemas import GameTheoryAnalysis, GameNode
+import hashlib
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from backend import REQUEST_FAILED, analyze_texts, fetch_article, fetch_articles, split_verdict, stream_text_to_game
+from schemas import Action, GameTheoryAnalysis, GameNode, Payoff, dump_analysis, load_analysis
+
+# Heavy modules are imported where they are used to keep cold start short.
+if TYPE_CHECKING:
+    import graphviz
 
 st.set_page_config(layout="wide", page_title="News -> Game Theory Agent")
 
@@ -21,11 +26,14 @@ with st.sidebar:
     st.divider()
     
     st.header("Input Source")
-    input_type = st.radio("Choose Input:", ["URL", "Raw Text"])
+    input_type = st.radio("Choose Input:", ["URL", "URL List", "Raw Text"])
     
     # Initialize session state for article text if not present
     if "article_text" not in st.session_state:
         st.session_state.article_text = ""
+    # List of (url, text) pairs for the URL List mode
+    if "batch_articles" not in st.session_state:
+        st.session_state.batch_articles = []
 
     if input_type == "URL":
         url = st.text_input("Enter Article URL")
@@ -42,115 +50,338 @@ with st.sidebar:
         if st.session_state.article_text:
             st.expander("Show Content").write(st.session_state.article_text[:500] + "...")
 
+    elif input_type == "URL List":
+        urls_text = st.text_area("Enter Article URLs (one per line)", height=150)
+        if st.button("Fetch All"):
+            urls = [u.strip() for u in urls_text.splitlines() if u.strip()]
+            with st.spinner(f"Fetching {len(urls)} articles..."):
+                fetched = fetch_articles(urls)
+            st.session_state.batch_articles = [(u, t) for u, t in zip(urls, fetched) if t]
+            if st.session_state.batch_articles:
+                st.success(f"Fetched {len(st.session_state.batch_articles)} of {len(urls)} articles.")
+            for u, t in zip(urls, fetched):
+                if not t:
+                    st.error(f"Failed to fetch {u}")
+
+        # Show content if available
+        if st.session_state.batch_articles:
+            with st.expander("Show Content"):
+                for u, t in st.session_state.batch_articles:
+                    st.write(f"**{u}**: {t[:200]}...")
+
     else:
         # For raw text, we bind directly or update state
         st.session_state.article_text = st.text_area("Paste Article Text Here", value=st.session_state.article_text, height=300)
     
     run_btn = st.button("Generate Game Model", type="primary")
 
+    st.divider()
+
+    st.header("Display")
+    # Deeper/larger parts of the tree are replaced by "…" to keep layout time bounded
+    st.slider("Max tree depth", min_value=2, max_value=20, value=8, key="max_depth")
+    st.slider("Max tree nodes", min_value=50, max_value=2000, value=500, step=50, key="max_nodes")
+
 # --- Helper: Visualizer ---
+import collections
+import functools
 import textwrap
 
+@functools.lru_cache(maxsize=512)
 def wrap_text(text, width=20):
     """Helper to wrap long text into multiple lines for graph nodes."""
     if not text:
         return ""
     return "\n".join(textwrap.wrap(text, width=width))
 
-def draw_game_tree(root_node: GameNode) -> graphviz.Digraph:
+def quote_dot(text: str) -> str:
+    """Quotes a string as a DOT ID/label (newlines become centered line breaks)."""
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+def preview_tree(root) -> GameNode:
+    """
+    Copies a streamed, partial game tree into GameNode/Action/Payoff models.
+    instructor's Partial only builds the root as a model; nested actions and
+    nodes arrive as (possibly incomplete) dicts. Children that aren't an object
+    yet are left out.
+    """
+    def get(obj, name):
+        return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+    # Pre-order walk, then build in reverse so children exist before their parents.
+    order = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        for a in get(node, "actions") or ():
+            child = get(a, "next_node")
+            if isinstance(child, (dict, GameNode)):
+                stack.append(child)
+
+    built = {}
+    for node in reversed(order):
+        actions = [
+            Action.model_construct(
+                name=get(a, "name"),
+                description=get(a, "description"),
+                probability=get(a, "probability"),
+                next_node=built[id(get(a, "next_node"))],
+            )
+            for a in get(node, "actions") or ()
+            if id(get(a, "next_node")) in built
+        ]
+        payoff = get(node, "payoff")
+        if isinstance(payoff, (dict, Payoff)):
+            payoff = Payoff.model_construct(outcome_summary=get(payoff, "outcome_summary"), utilities=get(payoff, "utilities"))
+        else:
+            payoff = None
+        built[id(node)] = GameNode.model_construct(
+            id=get(node, "id"),
+            current_player_name=get(node, "current_player_name"),
+            is_terminal=bool(get(node, "is_terminal")),
+            actions=actions or None,
+            payoff=payoff,
+        )
+    return built[id(root)]
+
+def structural_ids(root_node: GameNode) -> Dict[int, str]:
+    """
+    Maps id(node) -> a short hash of the node's whole subtree (player, payoff,
+    actions and their children), so structurally identical subtrees share an ID.
+    """
+    # Pre-order walk, then hash in reverse so children are hashed before parents.
+    order = []
+    stack = [root_node]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(a.next_node for a in node.actions or () if a.next_node is not None)
+
+    ids = {}
+    for node in reversed(order):
+        payoff = node.payoff
+        parts = [str(bool(node.is_terminal)), node.current_player_name or ""]
+        if payoff:
+            parts += [payoff.outcome_summary or "", repr(tuple(payoff.utilities or ()))]
+        for a in node.actions or ():
+            if a.next_node is not None:
+                parts += [a.name or "", str(a.probability), ids[id(a.next_node)]]
+        ids[id(node)] = hashlib.blake2b("\x1f".join(parts).encode(), digest_size=6).hexdigest()
+    return ids
+
+def draw_game_tree(root_node: GameNode, player_order: List[str], max_depth: int = 8, max_nodes: int = 500) -> "graphviz.Source":
     """
     Traverses the Pydantic GameNode structure and builds a Graphviz object.
+    `player_order` names the entries of each payoff's utilities list.
+    Walks breadth-first with an explicit queue so deep trees can't hit the recursion
+    limit, and writes DOT lines directly instead of going through Digraph.node/edge
+    per element.
+    Identical subtrees are drawn once (the tree becomes a DAG), which keeps the
+    layout small when e.g. several Nature branches share a continuation. Breadth-first
+    order reaches each shared subtree first at its shallowest depth.
+    Nodes deeper than `max_depth`, or beyond the first `max_nodes`, are replaced
+    by a "…" leaf so the layout cost stays bounded.
     """
-    dot = graphviz.Digraph()
-    dot.attr(rankdir='TB')  # CHANGED: Top-to-Bottom (Classic Game Theory style)
-    dot.attr(splines='ortho')
-    dot.attr(nodesep='0.5') # Add space between nodes
-    dot.attr(ranksep='1.0') # Add space between levels
-    
-    def add_nodes_edges(node: GameNode, parent_id=None, edge_label=""):
-        node_id = str(id(node))
-        
-        # Wrap the text so nodes don't get super wide
-        # Note: GameNode schema doesn't strictly have 'description' on the node itself in the original schema,
-        # but it might be useful to add or just use player name. 
-        # Checking schema: GameNode has 'current_player_name'. 
-        # Let's use current_player_name.
+    lines = [
+        "digraph {",
+        "rankdir=TB;",  # Top-to-Bottom (Classic Game Theory style)
+        "splines=ortho;",
+        "nodesep=0.5;",  # Add space between nodes
+        "ranksep=1.0;",  # Add space between levels
+    ]
+
+    ids = structural_ids(root_node) if root_node else {}
+    emitted_nodes = set()
+    emitted_edges = set()
+
+    # Entries: (node, parent_id, edge_label, depth)
+    queue = collections.deque([(root_node, None, "", 0)] if root_node else [])
+    while queue:
+        node, parent_id, edge_label, depth = queue.popleft()
+        node_id = quote_dot(ids[id(node)])
+        # An already drawn subtree is linked to, not cut, however deep this path is
+        cut = node_id not in emitted_nodes and (depth > max_depth or len(emitted_nodes) >= max_nodes)
+        if cut:
+            node_id = quote_dot(f"{ids[id(node)]}-cut")
+
+        if parent_id and (parent_id, node_id, edge_label) not in emitted_edges:
+            emitted_edges.add((parent_id, node_id, edge_label))
+            # Wrap edge labels too (action names)
+            wrapped_edge = quote_dot(wrap_text(edge_label, width=15))
+            lines.append(f'{parent_id} -> {node_id} [label={wrapped_edge} fontsize=9];')
+
+        if cut:
+            lines.append(f'{node_id} [label="…" shape=plaintext fontname=Arial fontsize=14];')
+            continue
+
+        # A duplicate subtree is already drawn; the edge above is all it needs.
+        if node_id in emitted_nodes:
+            continue
+        emitted_nodes.add(node_id)
         
-        wrapped_player = wrap_text(node.current_player_name or "Unknown", width=20)
+        # Read each field once; the checks below would otherwise repeat the lookups.
+        player = node.current_player_name
+        payoff = node.payoff
+        actions = node.actions
         
         if node.is_terminal:
             # Payoff Node Styling
             outcome_text = ""
             payoff_text = ""
-            if node.payoff:
-                outcome_text = wrap_text(node.payoff.outcome_summary, width=30)
-                payoff_text = "\n".join([f"{k}: {v}" for k,v in node.payoff.utilities.items()])
+            if payoff:
+                outcome_text = wrap_text(payoff.outcome_summary, width=30)
+                payoff_text = payoff.utilities_label(player_order)
             
-            label = f"Outcome:\n{outcome_text}\n\nPayoffs:\n{payoff_text}"
-            dot.node(node_id, label, shape='box', style='filled', fillcolor='#f0f2f6', fontname="Arial", fontsize="10")
+            label = quote_dot(f"Outcome:\n{outcome_text}\n\nPayoffs:\n{payoff_text}")
+            lines.append(f'{node_id} [label={label} shape=box style=filled fillcolor="#f0f2f6" fontname=Arial fontsize=10];')
         else:
-            # Decision Node Styling
-            label = f"{wrapped_player}\n(Moves)"
+            # Decision Node Styling (current_player_name is the node's label)
+            wrapped_player = wrap_text(player or "Unknown", width=20)
+            label = quote_dot(f"{wrapped_player}\n(Moves)")
             # Differentiate Nature nodes
-            shape = 'diamond' if node.current_player_name and node.current_player_name.lower() == 'nature' else 'oval'
-            color = 'lightgrey' if node.current_player_name and node.current_player_name.lower() == 'nature' else 'white'
-            dot.node(node_id, label, shape=shape, style='filled', fillcolor=color, fontname="Arial", fontsize="11")
+            is_nature = bool(player) and player.lower() == 'nature'
+            shape = 'diamond' if is_nature else 'oval'
+            color = 'lightgrey' if is_nature else 'white'
+            lines.append(f'{node_id} [label={label} shape={shape} style=filled fillcolor={color} fontname=Arial fontsize=11];')
         
-        if parent_id:
-            # Wrap edge labels too (action names)
-            wrapped_edge = wrap_text(edge_label, width=15)
-            dot.edge(parent_id, node_id, label=wrapped_edge, fontsize="9")
-        
-        if node.actions:
-            for action in node.actions:
-                lbl = action.name
-                if action.probability:
-                    lbl += f"\n(p={action.probability})"
-                add_nodes_edges(action.next_node, node_id, lbl)
+        if actions:
+            for action in actions:
+                # Streamed (partial) trees may not have the child yet
+                if action.next_node is None:
+                    continue
+                lbl = action.name or ""
+                probability = action.probability
+                if probability:
+                    lbl += f"\n(p={probability})"
+                queue.append((action.next_node, node_id, lbl, depth + 1))
+
+    lines.append("}")
+    import graphviz
+    return graphviz.Source("\n".join(lines))
+
+# --- Caching ---
+# Streamlit reruns the whole script on every widget interaction, so the tree layout
+# is cached here; finished analyses come back from the backend's disk cache.
+# Arguments starting with "_" are not hashed.
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_tree_graph(model_json: bytes, max_depth: int, max_nodes: int) -> Tuple[str, Optional[str]]:
+    """
+    DOT source and server-side SVG rendering (native `dot`) of the game tree of a
+    serialized analysis. The SVG is None when the Graphviz binary isn't installed.
+    """
+    import graphviz
+    analysis = load_analysis(model_json)
+    graph = draw_game_tree(analysis.game_tree, analysis.player_order or [], max_depth, max_nodes)
+    try:
+        svg = graph.pipe(format="svg", engine="dot").decode()
+    except graphviz.ExecutableNotFound:
+        svg = None
+    return graph.source, svg
+
+# Minimum seconds between live tree redraws while the response streams in.
+PREVIEW_INTERVAL = 0.2
+
+def analyze_with_preview(text: str, api_key: Optional[str], placeholder) -> Tuple[Optional[GameTheoryAnalysis], str]:
+    """
+    Streams the analysis while drawing the partial game tree into `placeholder`
+    (throttled to PREVIEW_INTERVAL). An analysis in the disk cache arrives at once.
+    """
+    last_draw = 0.0
+    final = None
+    for partial in stream_text_to_game(text, api_key):
+        final = partial
+        now = time.monotonic()
+        if partial.game_tree and now - last_draw >= PREVIEW_INTERVAL:
+            last_draw = now
+            try:
+                tree = preview_tree(partial.game_tree)
+                placeholder.graphviz_chart(draw_game_tree(tree, partial.player_order or [], st.session_state.max_depth, st.session_state.max_nodes), width="stretch")
+            except Exception:
+                # The preview is best-effort; a half-streamed shape must never abort the analysis.
+                pass
+    placeholder.empty()
+
+    return split_verdict(final)
 
-    if root_node:
-        add_nodes_edges(root_node)
-    return dot
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_batch_analysis(text_hashes: Tuple[str, ...], key_fp: str, _texts: List[str], _api_key: Optional[str]) -> List[Tuple[Optional[GameTheoryAnalysis], str]]:
+    """analyze_texts (concurrent), keyed on fingerprints of the texts and API key."""
+    return analyze_texts(_texts, api_key=_api_key)
 
 # --- Main Interface ---
-if run_btn and st.session_state.article_text:
-    with st.spinner("Agent is modeling the game..."):
-        try:
-            response, reasoning = analyze_text_to_game(st.session_state.article_text, api_key=api_key)
-            
-            if response:
-                # Layout: 2 Columns
-                col1, col2 = st.columns([1, 2])
+def render_analysis(response: Optional[GameTheoryAnalysis], reasoning: str):
+    """Shows one analysis: narrative/solution on the left, game tree on the right."""
+    if response:
+        # Layout: 2 Columns
+        col1, col2 = st.columns([1, 2])
                 
-                with col1:
-                    st.subheader("Narrative Analysis")
-                    st.write(f"**Title:** {response.title}")
-                    st.write(f"**Strategic Summary:** {response.strategic_summary}")
-                    st.write(f"**Confidence Score:** {response.confidence_score}/100")
-
-                    st.markdown("---")
-                    st.subheader("Game Solution")
-                    st.info(f"**Nash Equilibrium:** {response.nash_equilibrium_explanation}")
-                    st.warning(f"**Model vs. Reality:** {response.actual_events_comparison}")
+        with col1:
+            st.subheader("Narrative Analysis")
+            st.write(f"**Title:** {response.title}")
+            st.write(f"**Strategic Summary:** {response.strategic_summary}")
+            st.write(f"**Confidence Score:** {response.confidence_score}/100")
+
+            st.markdown("---")
+            st.subheader("Game Solution")
+            if response.nash_equilibrium_explanation:
+                st.info(f"**Nash Equilibrium:** {response.nash_equilibrium_explanation}")
+            st.warning(f"**Model vs. Reality:** {response.actual_events_comparison}")
                     
-                    st.subheader("Players")
-                    for p in response.players:
-                        st.markdown(f"- **{p.name}** ({p.role.value}): {p.description}")
-
-                with col2:
-                    st.subheader("Game Tree Visualization")
-                    if response.game_tree:
-                        graph = draw_game_tree(response.game_tree)
-                        st.graphviz_chart(graph, use_container_width=True)
+            st.subheader("Players")
+            for p in response.players or []:
+                st.markdown(f"- **{p.name}** ({p.role.value}): {p.description}")
+
+        with col2:
+            st.subheader("Game Tree Visualization")
+            if response.game_tree:
+                source, svg = cached_tree_graph(dump_analysis(response), st.session_state.max_depth, st.session_state.max_nodes)
+                if svg:
+                    st.image(svg, width="stretch")
+                else:
+                    # No local Graphviz: fall back to rendering in the browser
+                    st.graphviz_chart(source, width="stretch")
                         
-                        with st.expander("🔍 View Raw Text / Zoom Details"):
-                            st.info("If the tree is too large, use browser zoom or right-click 'Open Image in New Tab'.")
-                    else:
-                        st.warning("No game tree generated.")
+                with st.expander("🔍 View Raw Text / Zoom Details"):
+                    st.info("If the tree is too large, use browser zoom or right-click 'Open Image in New Tab'.")
             else:
-                st.warning("No strategic game detected in the text.")
-                st.info(f"**Agent Reasoning:** {reasoning}")
-                
+                st.warning("No game tree generated.")
+    else:
+        st.warning("No strategic game detected in the text.")
+        st.info(f"**Agent Reasoning:** {reasoning}")
+
+if run_btn and input_type == "URL List":
+    batch = st.session_state.batch_articles
+    if not batch:
+        st.error("Please fetch at least one article first.")
+    else:
+        results = []
+        with st.spinner(f"Agent is modeling {len(batch)} articles..."):
+            try:
+                texts = [t for _, t in batch]
+                results = cached_batch_analysis(tuple(fingerprint(t) for t in texts), fingerprint(api_key or ""), texts, api_key)
+                # Don't keep failures cached; finished articles come back from the disk cache on retry
+                if any(reasoning.startswith(REQUEST_FAILED) for _, reasoning in results):
+                    cached_batch_analysis.clear()
+            except Exception as e:
+                st.error(f"An error occurred during analysis: {e}")
+        if results:
+            tabs = st.tabs([f"Article {i + 1}" for i in range(len(batch))])
+            for tab, (url, _), (response, reasoning) in zip(tabs, batch, results):
+                with tab:
+                    st.caption(url)
+                    render_analysis(response, reasoning)
+elif run_btn and st.session_state.article_text:
+    with st.spinner("Agent is modeling the game..."):
+        try:
+            preview = st.empty()
+            response, reasoning = analyze_with_preview(st.session_state.article_text, api_key, preview)
+            render_analysis(response, reasoning)
         except Exception as e:
             st.error(f"An error occurred during analysis: {e}")
 elif run_btn and not st.session_state.article_text:
@@ -1,82 +1,171 @@
 import os
-import trafilatura
-import instructor
-from openai import OpenAI
-from pydantic import BaseModel, Field
-from typing import Optional, Tuple, Union
-from schemas import GameTheoryAnalysis
+import json
+import asyncio
+import functools
+import hashlib
+import threading
+import httpx
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Iterator, List, Optional, Tuple, TypeVar, Union
+from schemas import GameTheoryAnalysis, dump_analysis, load_analysis
 from dotenv import load_dotenv
 
+# instructor/openai, tiktoken, selectolax, trafilatura and diskcache are imported
+# where they are used: they are slow to import and not every code path needs them.
+if TYPE_CHECKING:
+    import diskcache
+    import instructor
+    import tiktoken
+
 # Load environment variables
 load_dotenv()
 
-# Initialize the client with Instructor
-try:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        # Don't fail yet, maybe the user will provide it in the UI (we'll handle this in app.py/backend.py)
-        client = None
-    else:
-        client = instructor.from_openai(OpenAI(api_key=api_key))
-except Exception as e:
-    print(f"Warning: OpenAI client could not be initialized. Error: {e}")
-    client = None
-
-class ScreenerOutput(BaseModel):
-    is_strategic_game: bool = Field(..., description="Does the text describe a situation with strategic interdependence between players?")
-    reasoning: str = Field(..., description="Brief explanation of why this is or isn't a game.")
+# A single long-lived event loop for all LLM I/O.
+# asyncio.run() would create (and close) a fresh loop per call, which breaks the
+# AsyncOpenAI connection pool on the next call. Streamlit reruns the script on a new
+# thread each time, so we keep the loop on its own daemon thread instead.
+_loop = asyncio.new_event_loop()
+threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
 
-def fetch_article(url: str) -> Optional[str]:
+T = TypeVar("T")
+
+def run_sync(coro: Awaitable[T]) -> T:
     """
-    Fetches and extracts main text from a URL using Trafilatura.
+    Runs a coroutine on the shared background loop and blocks until it completes.
     """
-    downloaded = trafilatura.fetch_url(url)
-    if downloaded:
-        return trafilatura.extract(downloaded)
-    return None
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
 
-def analyze_text_to_game(text: str, api_key: str = None) -> Tuple[Optional[GameTheoryAnalysis], str]:
+# --- LLM clients ---
+# Model used for analysis. Set OPENAI_MODEL (e.g. "gpt-4o-mini") to trade tree quality for cost and latency.
+MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+
+@functools.lru_cache(maxsize=None)
+def _openai_http() -> httpx.AsyncClient:
     """
-    Orchestrates the analysis pipeline:
-    1. Screen the text for strategic interdependence.
-    2. If positive, model it as a Game Theory problem.
-    
-    Returns:
-        tuple: (GameTheoryAnalysis object or None, reasoning string)
+    One pooled HTTP/2 transport for every OpenAI client, so repeated calls reuse
+    warm TLS connections. Only ever used from `_loop`.
     """
-    global client
-    
-    # If client is not initialized, try to initialize it with the provided key
-    current_client = client
-    if not current_client and api_key:
-        try:
-            current_client = instructor.from_openai(OpenAI(api_key=api_key))
-        except Exception as e:
-            raise RuntimeError(f"Failed to initialize OpenAI client with provided key: {e}")
-            
-    if not current_client:
+    from openai import DefaultAsyncHttpxClient
+    return DefaultAsyncHttpxClient(http2=True, limits=httpx.Limits(max_keepalive_connections=32))
+
+@functools.lru_cache(maxsize=8)
+def _instructor_client(api_key: str) -> "instructor.AsyncInstructor":
+    import instructor
+    from openai import AsyncOpenAI
+    return instructor.from_openai(AsyncOpenAI(api_key=api_key, http_client=_openai_http()))
+
+def get_client(api_key: Optional[str] = None) -> "instructor.AsyncInstructor":
+    """
+    Returns the cached client for the environment key, or for `api_key` if none is set.
+    """
+    key = os.getenv("OPENAI_API_KEY") or api_key
+    if not key:
         raise RuntimeError("LLM Client not initialized. Please check your API keys.")
+    try:
+        return _instructor_client(key)
+    except Exception as e:
+        raise RuntimeError(f"Failed to initialize OpenAI client with provided key: {e}")
 
-    # Step 1: Screener Agent
-    screener_response = current_client.chat.completions.create(
-        model="gpt-4o", # Or gpt-3.5-turbo, depending on budget/availability
-        response_model=ScreenerOutput,
-        messages=[
-            {"role": "system", "content": "You are a Game Theory Scout. Your job is to identify if a given text contains 'Strategic Interdependence' - where the outcome for one actor depends on the choices of another. Look for conflicts, negotiations, elections, or competitive markets."},
-            {"role": "user", "content": f"Analyze this text: {text[:4000]}"} # Truncate to avoid context limits if necessary
-        ]
-    )
+# Below this length the fast extractor probably missed the article body.
+MIN_ARTICLE_CHARS = 500
+_BOILERPLATE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "iframe", "svg"]
 
-    if not screener_response.is_strategic_game:
-        return None, screener_response.reasoning
+def _extract_main_text(html: str) -> Optional[str]:
+    """
+    Fast main-text heuristic: paragraphs of the <article> element (or <body>).
+    Returns None when the result looks too short to be the article.
+    """
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(_BOILERPLATE_TAGS)
+    root = tree.css_first("article") or tree.body
+    if root is None:
+        return None
+    # Keep the whitespace between inline elements, then collapse runs of it
+    paragraphs = (" ".join(node.text().split()) for node in root.css("p"))
+    text = "\n".join(p for p in paragraphs if p)
+    return text if len(text) >= MIN_ARTICLE_CHARS else None
 
-    # Step 2: Modeler Agent
-    # We force the schema defined in schemas.py
-    game_analysis = current_client.chat.completions.create(
-        model="gpt-4o",
-        response_model=GameTheoryAnalysis,
-        messages=[
-            {"role": "system", "content": """You are an expert Game Theory Modeler. Your goal is to map a news narrative into a mathematical "Extensive Form Game" tree.
+# Upper bound on simultaneous downloads in `afetch_articles`.
+MAX_CONCURRENT_FETCHES = 16
+
+def _http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(http2=True, timeout=10, follow_redirects=True)
+
+async def _download_article(http: httpx.AsyncClient, url: str) -> Optional[str]:
+    """
+    Downloads a URL and extracts its main text with selectolax, falling back to
+    Trafilatura's extractor when the heuristic fails.
+    """
+    try:
+        response = await http.get(url)
+        response.raise_for_status()
+    except (httpx.HTTPError, httpx.InvalidURL):
+        return None
+    html = response.text
+    text = _extract_main_text(html)
+    if text:
+        return text
+    import trafilatura
+    return trafilatura.extract(html, include_comments=False, include_tables=False)
+
+async def afetch_article(url: str) -> Optional[str]:
+    """
+    Fetches and extracts main text from a single URL.
+    """
+    async with _http_client() as http:
+        return await _download_article(http, url)
+
+async def afetch_articles(urls: List[str]) -> List[Optional[str]]:
+    """
+    Fetches several URLs concurrently over one connection pool, at most
+    MAX_CONCURRENT_FETCHES at a time. Results are returned in input order.
+    """
+    sem = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+    async with _http_client() as http:
+        async def one(url: str) -> Optional[str]:
+            async with sem:
+                return await _download_article(http, url)
+        return await asyncio.gather(*(one(u) for u in urls))
+
+def fetch_article(url: str) -> Optional[str]:
+    """
+    Blocking wrapper around `afetch_article`.
+    """
+    return run_sync(afetch_article(url))
+
+def fetch_articles(urls: List[str]) -> List[Optional[str]]:
+    """
+    Blocking wrapper around `afetch_articles`.
+    """
+    return run_sync(afetch_articles(urls))
+
+# gpt-4o has a 128k context; leave room for the system prompt and the (large) tree response.
+MAX_INPUT_TOKENS = 100_000
+
+@functools.lru_cache(maxsize=None)
+def _encoding() -> "tiktoken.Encoding":
+    import tiktoken
+    return tiktoken.get_encoding("o200k_base")  # gpt-4o tokenizer
+
+def truncate_to_tokens(text: str, max_tokens: int = MAX_INPUT_TOKENS) -> str:
+    """
+    Cuts text to at most `max_tokens` model tokens.
+    """
+    # Byte-level BPE: every token covers at least one UTF-8 byte (a single
+    # character can take several tokens), so texts this short need no encoding.
+    if len(text.encode()) <= max_tokens:
+        return text
+    enc = _encoding()
+    ids = enc.encode(text, disallowed_special=())
+    if len(ids) <= max_tokens:
+        return text
+    return enc.decode(ids[:max_tokens])
+
+# --- Prompts ---
+# OpenAI caches identical prompt prefixes (>= 1024 tokens). Everything that never
+# changes lives in SHARED_PREAMBLE and is sent first; task instructions follow, and
+# the article always comes last. Do not interpolate anything into the preamble.
+SHARED_PREAMBLE = """You are an expert Game Theory Modeler. Your goal is to map a news narrative into a mathematical "Extensive Form Game" tree.
 
 ### CRITICAL RULES:
 1.  **Aggregation (Max 3 Players):** You MUST aggregate real-world entities into maximum 2-3 opposing sides + "Nature".
@@ -93,18 +182,274 @@ def analyze_text_to_game(text: str, api_key: str = None) -> Tuple[Optional[GameT
 
 4.  **Utilities:** Assign VNM Cardinal Utilities (-100 to 100) to the leaf nodes.
     * These must reflect the *conflict*. If Player A wins (+50), Player B usually loses (-50), unless it's a cooperative game.
+    * List the players who receive payoffs (never "Nature") once in `player_order`. Every leaf's `utilities` is a list with exactly one number per player, in that order.
 
 5.  **Root Node:** You MUST assign a specific `current_player_name` to the root node. It cannot be "Unknown".
 
 6.  **Analysis:**
     *   **Nash Equilibrium:** Provide a clear textual explanation of the game's solution (Nash Equilibrium). What is the stable outcome?
     *   **Reality Check:** Compare your model's prediction (the equilibrium) to what actually happened in the news article. Did the players act rationally?
-"""},
-            {"role": "user", "content": f"Model this text: {text}"}
-        ]
-    )
+
+### WORKED EXAMPLE:
+*Text:* "Two rival airlines, SkyJet and AeroLine, share the busiest domestic route. SkyJet is weighing a fare cut before the holidays; AeroLine has said it will respond to any price move. A pending court ruling may force both to lower airport fees anyway."
+*Model:*
+*   Players: "SkyJet" (decision_maker), "AeroLine" (decision_maker), "Nature" (nature, the court ruling).
+*   player_order: ["SkyJet", "AeroLine"]
+*   Root: "SkyJet" chooses ["Cut Fares", "Hold Fares"].
+*   After each SkyJet action: "AeroLine" chooses ["Cut Fares", "Hold Fares"].
+*   After (Cut Fares, Cut Fares): "Nature" draws ["Fees Lowered" (p=0.4), "Fees Unchanged" (p=0.6)].
+*   Leaves, utilities as [SkyJet, AeroLine]:
+    * Cut/Cut/Fees Lowered: [-5, -5] - a price war softened by lower costs.
+    * Cut/Cut/Fees Unchanged: [-30, -30] - a full price war.
+    * Cut/Hold: [40, -40] - SkyJet steals holiday traffic.
+    * Hold/Cut: [-40, 40] - AeroLine undercuts.
+    * Hold/Hold: [10, 10] - tacit collusion on prices.
+*   Nash Equilibrium: By backward induction AeroLine cuts after a SkyJet cut (expected -20 > -40) and also after a hold (+40 > +10). SkyJet therefore compares an expected -20 from cutting with -40 from holding, and cuts. The subgame-perfect outcome is a price war (Cut Fares, Cut Fares), although both would prefer (Hold Fares, Hold Fares) - a sequential Prisoner's Dilemma.
+*   Reality Check: Compare that prediction with what the article says the airlines actually did.
+"""
+
+MODELER_INSTRUCTIONS = """### STEP 1 - SCREENING:
+First decide if the text contains 'Strategic Interdependence' - where the outcome for one actor depends on the choices of another. Look for conflicts, negotiations, elections, or competitive markets.
+*   Set `is_strategic_game` and explain your verdict in `screener_reasoning`.
+*   If it is NOT a game, stop there: leave `players`, `game_tree` and `nash_equilibrium_explanation` empty.
+
+### STEP 2 - MODELING (only if it is a game):
+Follow the CRITICAL RULES above and fill in the full `GameTheoryAnalysis`.
+"""
+
+def build_messages(text: str) -> List[dict]:
+    """
+    Chat messages for one analysis: the cache-friendly preamble, the task
+    instructions, then the (token-capped) article.
+    """
+    return [
+        {"role": "system", "content": SHARED_PREAMBLE},
+        {"role": "system", "content": MODELER_INSTRUCTIONS},
+        {"role": "user", "content": f"Model this text: {truncate_to_tokens(text)}"},
+    ]
+
+# --- Persistent analysis cache ---
+# Responses are stored on disk keyed by the article text, the model and the prompt
+# version, so identical inputs never hit the LLM twice, even across restarts.
+# PROMPT_VERSION changes automatically whenever the prompts or the schema change.
+PROMPT_VERSION = hashlib.sha256(
+    (SHARED_PREAMBLE + MODELER_INSTRUCTIONS + json.dumps(GameTheoryAnalysis.model_json_schema(), sort_keys=True)).encode()
+).hexdigest()[:12]
+CACHE_DIR = os.getenv("GTA_CACHE_DIR", ".gta_cache")
+
+@functools.lru_cache(maxsize=None)
+def _disk_cache() -> "diskcache.Cache":
+    import diskcache
+    return diskcache.Cache(CACHE_DIR)
+
+def _cache_key(text: str) -> str:
+    return hashlib.sha256(f"{MODEL}\x1f{PROMPT_VERSION}\x1f{text}".encode()).hexdigest()
+
+def _cache_get(text: str) -> Optional[GameTheoryAnalysis]:
+    raw = _disk_cache().get(_cache_key(text))
+    if raw is None:
+        return None
+    try:
+        return load_analysis(raw)
+    except (ValueError, LookupError, TypeError, AttributeError):
+        # Corrupt or outdated entry (msgspec.DecodeError is a ValueError; fast_build
+        # trips over unexpected shapes with the others): treat it as a miss and let it
+        # be overwritten.
+        return None
+
+def _cache_put(text: str, game_analysis: GameTheoryAnalysis) -> None:
+    _disk_cache().set(_cache_key(text), dump_analysis(game_analysis))
+
+# Reasoning prefix for texts whose analysis failed in the multi-text helpers
+REQUEST_FAILED = "Request failed: "
+
+def split_verdict(game_analysis: GameTheoryAnalysis) -> Tuple[Optional[GameTheoryAnalysis], str]:
+    """
+    Maps a raw response to the pipeline's (analysis or None, reasoning) result.
+    """
+    if not game_analysis.is_strategic_game:
+        return None, game_analysis.screener_reasoning
     
-    return game_analysis, screener_response.reasoning
+    return game_analysis, game_analysis.screener_reasoning
+
+async def aanalyze_text_to_game(text: str, api_key: str = None) -> Tuple[Optional[GameTheoryAnalysis], str]:
+    """
+    Orchestrates the analysis pipeline in a single LLM call:
+    1. Screen the text for strategic interdependence.
+    2. If positive, model it as a Game Theory problem.
+    
+    Returns:
+        tuple: (GameTheoryAnalysis object or None, reasoning string)
+    """
+    cached = _cache_get(text)
+    if cached is not None:
+        return split_verdict(cached)
+
+    current_client = get_client(api_key)
+
+    # Screener + Modeler Agent
+    # We force the schema defined in schemas.py; the screening verdict is part of it.
+    game_analysis = await current_client.chat.completions.create(
+        model=MODEL,
+        response_model=GameTheoryAnalysis,
+        messages=build_messages(text),
+    )
+
+    _cache_put(text, game_analysis)
+    return split_verdict(game_analysis)
+
+async def astream_text_to_game(text: str, api_key: str = None) -> AsyncIterator[GameTheoryAnalysis]:
+    """
+    Streams the analysis as it is generated. Yields partial objects (every field,
+    at every depth, may still be None); the last item is the fully validated
+    GameTheoryAnalysis. Pass it to `split_verdict` for the pipeline result.
+    A cached analysis is yielded once, without streaming.
+    """
+    cached = _cache_get(text)
+    if cached is not None:
+        yield cached
+        return
+
+    current_client = get_client(api_key)
+
+    last = None
+    async for partial in current_client.chat.completions.create_partial(
+        model=MODEL,
+        response_model=GameTheoryAnalysis,
+        messages=build_messages(text),
+    ):
+        last = partial
+        yield partial
+
+    if last is None:
+        raise RuntimeError("The model returned an empty response.")
+    game_analysis = GameTheoryAnalysis.model_validate(last.model_dump())
+    _cache_put(text, game_analysis)
+    yield game_analysis
+
+async def aanalyze_texts(texts: List[str], api_key: str = None) -> List[Tuple[Optional[GameTheoryAnalysis], str]]:
+    """
+    Analyzes several texts concurrently. Results are returned in input order;
+    a text whose analysis failed gets (None, error message) so the rest still
+    come back, as in `aanalyze_texts_batch`.
+    """
+    async def one(text: str) -> Tuple[Optional[GameTheoryAnalysis], str]:
+        try:
+            return await aanalyze_text_to_game(text, api_key)
+        except Exception as e:
+            return None, f"{REQUEST_FAILED}{e}"
+
+    return await asyncio.gather(*[one(t) for t in texts])
+
+def analyze_text_to_game(text: str, api_key: str = None) -> Tuple[Optional[GameTheoryAnalysis], str]:
+    """
+    Blocking wrapper around `aanalyze_text_to_game` for scripts and the UI thread.
+    """
+    return run_sync(aanalyze_text_to_game(text, api_key))
+
+# --- Offline batch mode (OpenAI Batch API: half price, 24h turnaround) ---
+BATCH_POLL_INTERVAL = 30  # seconds between status checks
+_BATCH_FINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+def _batch_request(custom_id: str, text: str) -> dict:
+    """
+    One line of the batch input file. The Batch API bypasses instructor, so the
+    schema is requested through `response_format` and validated on the way back.
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": MODEL,
+            "messages": build_messages(text),
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": "GameTheoryAnalysis", "schema": GameTheoryAnalysis.model_json_schema()},
+            },
+        },
+    }
+
+async def aanalyze_texts_batch(texts: List[str], api_key: str = None, poll_interval: float = BATCH_POLL_INTERVAL) -> List[Tuple[Optional[GameTheoryAnalysis], str]]:
+    """
+    Analyzes many texts through a single OpenAI Batch job and waits for it to finish.
+    Results are returned in input order; a text whose request failed gets
+    (None, error message). Texts already in the disk cache are not resubmitted.
+    """
+    results = [(None, f"{REQUEST_FAILED}no response in the batch output.")] * len(texts)
+    pending = []
+    for i, t in enumerate(texts):
+        cached = _cache_get(t)
+        if cached is not None:
+            results[i] = split_verdict(cached)
+        else:
+            pending.append(i)
+    if not pending:
+        return results
+
+    openai_client = get_client(api_key).client  # the raw AsyncOpenAI under instructor
+
+    payload = "\n".join(json.dumps(_batch_request(str(i), texts[i])) for i in pending)
+    input_file = await openai_client.files.create(file=("requests.jsonl", payload.encode()), purpose="batch")
+    batch = await openai_client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    while batch.status not in _BATCH_FINAL_STATES:
+        await asyncio.sleep(poll_interval)
+        batch = await openai_client.batches.retrieve(batch.id)
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'.")
+
+    if not batch.output_file_id:
+        return results
+    output = await openai_client.files.content(batch.output_file_id)
+    for line in output.text.splitlines():
+        record = json.loads(line)
+        index = int(record["custom_id"])
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            results[index] = (None, f"{REQUEST_FAILED}{record.get('error') or response.get('body')}")
+            continue
+        content = response["body"]["choices"][0]["message"]["content"]
+        try:
+            game_analysis = GameTheoryAnalysis.model_validate_json(content)
+        except ValueError as e:  # pydantic.ValidationError
+            results[index] = (None, f"{REQUEST_FAILED}invalid response ({e})")
+            continue
+        _cache_put(texts[index], game_analysis)
+        results[index] = split_verdict(game_analysis)
+    return results
+
+async def _anext_or_none(agen: AsyncIterator[T]) -> Optional[T]:
+    try:
+        return await agen.__anext__()
+    except StopAsyncIteration:
+        return None
+
+def stream_text_to_game(text: str, api_key: str = None) -> Iterator[GameTheoryAnalysis]:
+    """
+    Blocking iterator over `astream_text_to_game`.
+    """
+    agen = astream_text_to_game(text, api_key)
+    try:
+        while (item := run_sync(_anext_or_none(agen))) is not None:
+            yield item
+    finally:
+        run_sync(agen.aclose())
+
+def analyze_texts(texts: List[str], api_key: str = None) -> List[Tuple[Optional[GameTheoryAnalysis], str]]:
+    """
+    Blocking wrapper around `aanalyze_texts`.
+    """
+    return run_sync(aanalyze_texts(texts, api_key))
+
+def analyze_texts_batch(texts: List[str], api_key: str = None, poll_interval: float = BATCH_POLL_INTERVAL) -> List[Tuple[Optional[GameTheoryAnalysis], str]]:
+    """
+    Blocking wrapper around `aanalyze_texts_batch`. May wait up to the 24h batch window.
+    """
+    return run_sync(aanalyze_texts_batch(texts, api_key, poll_interval))
 
 if __name__ == "__main__":
     # Simple test
@@ -1,7 +1,8 @@
 from __future__ import annotations
-from typing import List, Dict, Optional, Literal, Union
+from typing import List, Optional, Literal, Sequence, Union
 from enum import Enum
-from pydantic import BaseModel, Field, field_validator, ValidationInfo
+import msgspec
+from pydantic import BaseModel, Field, field_validator, model_validator, ValidationInfo
 
 # --- Basic Enums & Classes ---
 
@@ -20,8 +21,12 @@ class Payoff(BaseModel):
     Note: Utility numbers are cardinal (VNM), derived from sentiment.
     """
     outcome_summary: str
-    # Map: Player Name -> Utility Value (float)
-    utilities: Dict[str, float]
+    # Utility Values (float), positionally aligned with GameTheoryAnalysis.player_order
+    utilities: List[float] = Field(..., description="One utility per player, in the order of `player_order`.")
+
+    def utilities_label(self, player_order: Sequence[str]) -> str:
+        """One "Player: utility" line per player."""
+        return "\n".join([f"{k}: {v}" for k, v in zip(player_order, self.utilities or ())])
 
 # --- Extensive Form (Tree) Structure ---
 
@@ -57,12 +62,57 @@ class GameNode(BaseModel):
             pass
         return v
 
+    @classmethod
+    def fast_build(cls, data: dict) -> "GameNode":
+        """
+        Rebuilds a subtree from trusted, already-validated data (e.g. a cache entry)
+        with `model_construct`, skipping per-node validation.
+        Instead of Pydantic's per-field recursive validators this is one flat pass that
+        only checks the structure the tree needs, raising ValueError if it is malformed.
+        """
+        # Pre-order walk; every child is listed after its parent, so building in
+        # reverse order always finds a node's children already constructed.
+        order = []
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, dict) or "id" not in node:
+                raise ValueError("Malformed game node: expected an object with an 'id'.")
+            order.append(node)
+            for action in node.get("actions") or ():
+                if not isinstance(action, dict) or "name" not in action or "next_node" not in action:
+                    raise ValueError(f"Malformed action under node {node['id']!r}.")
+                stack.append(action["next_node"])
+
+        built = {}
+        for node in reversed(order):
+            actions = node.get("actions")
+            if actions is not None:
+                actions = [
+                    Action.model_construct(**{**a, "next_node": built[id(a["next_node"])]})
+                    for a in actions
+                ]
+            payoff = node.get("payoff")
+            if payoff is not None:
+                if not isinstance(payoff, dict) or "utilities" not in payoff:
+                    raise ValueError(f"Malformed payoff at node {node['id']!r}.")
+                payoff = Payoff.model_construct(**payoff)
+            built[id(node)] = cls.model_construct(**{**node, "actions": actions, "payoff": payoff})
+        return built[id(data)]
+
 # --- Top Level Output ---
 
 class GameTheoryAnalysis(BaseModel):
+    # Screening verdict comes first so the model decides before it builds anything.
+    is_strategic_game: bool = Field(..., description="Does the text describe a situation with strategic interdependence between players?")
+    screener_reasoning: str = Field(..., description="Brief explanation of why this is or isn't a game.")
+
     title: str
     strategic_summary: str = Field(..., description="Explain WHY this is a game (interdependence).")
-    players: List[Player]
+    # Left empty when is_strategic_game is False
+    players: Optional[List[Player]] = None
+    # Names of the players that receive payoffs; fixes the order of every Payoff.utilities
+    player_order: Optional[List[str]] = Field(None, description="Names of the players who receive payoffs (not Nature), in the order used by every `utilities` list.")
     game_type: Literal["Extensive_Form", "Normal_Form"]
     
     # Primary Structure: The Root of the Tree
@@ -72,9 +122,61 @@ class GameTheoryAnalysis(BaseModel):
     confidence_score: int = Field(..., ge=0, le=100, description="How well does the text fit a game model?")
     
     # New Fields for Analysis
-    nash_equilibrium_explanation: str = Field(..., description="Explain the Game Solution (Nash Equilibrium) in text.")
+    nash_equilibrium_explanation: Optional[str] = Field(None, description="Explain the Game Solution (Nash Equilibrium) in text.")
     actual_events_comparison: str = Field(..., description="Compare the model's prediction to the Actual Events in the article.")
 
+    @model_validator(mode="after")
+    def validate_utilities_order(self):
+        # Utilities are positional, so a missing player_order or a leaf with the wrong
+        # number of utilities would silently mislabel payoffs. Raising here makes
+        # instructor re-ask the model instead.
+        # Partial (streaming) subclasses hold incomplete trees; skip them.
+        if type(self) is not GameTheoryAnalysis or not self.is_strategic_game or self.game_tree is None:
+            return self
+        if not self.player_order:
+            raise ValueError("`player_order` must list the players who receive payoffs when a game tree is given.")
+        expected = len(self.player_order)
+        stack = [self.game_tree]
+        while stack:
+            node = stack.pop()
+            if node.payoff is not None and len(node.payoff.utilities) != expected:
+                raise ValueError(
+                    f"Payoff at node {node.id!r} has {len(node.payoff.utilities)} utilities; "
+                    f"expected {expected}, one per player in `player_order` {self.player_order}."
+                )
+            stack.extend(a.next_node for a in node.actions or ())
+        return self
+
+    @classmethod
+    def fast_build(cls, data: dict) -> "GameTheoryAnalysis":
+        """
+        Trusted-data counterpart of `model_validate` (see `GameNode.fast_build`).
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Malformed analysis: expected a JSON object.")
+        players = data.get("players")
+        if players is not None:
+            players = [Player.model_construct(**{**p, "role": PlayerRole(p["role"])}) for p in players]
+        game_tree = data.get("game_tree")
+        if game_tree is not None:
+            game_tree = GameNode.fast_build(game_tree)
+        return cls.model_construct(**{**data, "players": players, "game_tree": game_tree})
+
 # Resolve recursion
 GameNode.update_forward_refs()
 Action.update_forward_refs()
+
+# --- Serialization ---
+# Pydantic stays the contract at the instructor boundary (it needs a BaseModel
+# response_model). For reloading stored analyses we parse with msgspec and rebuild
+# via `fast_build`, so only the LLM response pays for full validation.
+
+_json_decoder = msgspec.json.Decoder()
+
+def dump_analysis(analysis: GameTheoryAnalysis) -> bytes:
+    """Serializes an analysis to JSON bytes."""
+    return analysis.model_dump_json().encode()
+
+def load_analysis(raw: Union[bytes, str]) -> GameTheoryAnalysis:
+    """Rebuilds an analysis previously produced by `dump_analysis`."""
+    return GameTheoryAnalysis.fast_build(_json_decoder.decode(raw))
@@ -1,9 +1,10 @@
 import os
-from backend import analyze_text_to_game
+import argparse
+from backend import analyze_text_to_game, analyze_texts_batch
 from schemas import GameTheoryAnalysis
 
-def test_backend():
-    print("Testing Backend Logic...")
+def test_backend(batch: bool = False):
+    print("Testing Backend Logic..." + (" (OpenAI Batch API)" if batch else ""))
     
     if "OPENAI_API_KEY" not in os.environ:
         print("WARNING: OPENAI_API_KEY not found in environment. Skipping live LLM test.")
@@ -20,12 +21,16 @@ def test_backend():
     print(f"Input Text: {sample_text.strip()}")
     
     try:
-        result, reason = analyze_text_to_game(sample_text)
+        if batch:
+            print("Submitting as a batch job; this can take a while...")
+            [(result, reason)] = analyze_texts_batch([sample_text])
+        else:
+            result, reason = analyze_text_to_game(sample_text)
         if result:
             print("\nSUCCESS: Game Detected!")
             print(f"Title: {result.title}")
             print(f"Summary: {result.strategic_summary}")
-            print(f"Players: {[p.name for p in result.players]}")
+            print(f"Players: {[p.name for p in result.players or []]}")
             print("Tree Root Node ID:", result.game_tree.id if result.game_tree else "None")
         else:
             print(f"\nRESULT: No Game Detected. Reason: {reason}")
@@ -34,4 +39,7 @@ def test_backend():
         print(f"\nERROR during analysis: {e}")
 
 if __name__ == "__main__":
-    test_backend()
+    parser = argparse.ArgumentParser(description="Smoke-test the analysis backend.")
+    parser.add_argument("--batch", action="store_true", help="Route the request through the OpenAI Batch API.")
+    args = parser.parse_args()
+    test_backend(batch=args.batch)